@@ -1,64 +1,95 @@
+import os
 import random
 import sys
 import hmac
-import hashlib
 import secrets
-from typing import List, Tuple
-from tabulate import tabulate
-import numpy as np
+from collections import deque
+from typing import List, Sequence, Tuple
 from colorama import Fore, Style
 
+_GREEN, _YELLOW, _RED, _CYAN, _RESET = Fore.GREEN, Fore.YELLOW, Fore.RED, Fore.CYAN, Style.RESET_ALL
+
+# Cell formats indexed by probability category: low, medium, high
+_CATEGORY_FORMATS = (
+    f"{_RED}{{:.4f}}{_RESET}",  # Red for low probabilities
+    f"{_YELLOW}{{:.4f}}{_RESET}",  # Yellow for medium probabilities
+    f"{_GREEN}{{:.4f}}{_RESET}",  # Green for high probabilities
+)
+_TIE_CELL = f"{_CYAN}- (0.3333){_RESET}"  # Cyan for ties
+
 
 class ProbabilityCalculator:
     @staticmethod
-    def calculate_probabilities(dice):
-        num_dice = len(dice)
-        probabilities = np.zeros((num_dice, num_dice))
+    def win_count_kernel(values):
+        """Count pairwise face wins for a sequence of face tuples with plain integer loops."""
+        num_dice = len(values)
+        win_counts = [[0] * num_dice for _ in range(num_dice)]
 
+        # Only pairs with i < j are compared; wins(b, a) = total - wins(a, b) - ties(a, b).
+        # The diagonal stays 0 since a die is never played against itself.
         for i in range(num_dice):
-            for j in range(num_dice):
-                if i == j:
-                    probabilities[i][j] = 0.3333  # Ties have ~33% probability
-                else:
-                    probabilities[i][j] = ProbabilityCalculator.compare_dice(dice[i], dice[j])
+            faces_a = values[i]
+            for j in range(i + 1, num_dice):
+                faces_b = values[j]
+                wins = ties = 0
+                for face_a in faces_a:
+                    for face_b in faces_b:
+                        if face_a > face_b:
+                            wins += 1
+                        elif face_a == face_b:
+                            ties += 1
+                win_counts[i][j] = wins
+                win_counts[j][i] = len(faces_a) * len(faces_b) - wins - ties
+        return win_counts
+
+    @staticmethod
+    def calculate_win_counts(dice):
+        """Count, for every pair of dice, the face pairings won by the row dice."""
+        import numpy as np
+
+        win_counts = ProbabilityCalculator.win_count_kernel([d.values for d in dice])
+        return np.array(win_counts, dtype=np.int32)
+
+    @staticmethod
+    def calculate_probabilities(dice):
+        import numpy as np
+
+        wins = ProbabilityCalculator.calculate_win_counts(dice)
+        faces = len(dice[0].values)
+        probabilities = wins / (faces * faces)  # Rounded only when formatted for display
+        np.fill_diagonal(probabilities, 0.3333)  # Ties have ~33% probability
 
         return probabilities
 
     @staticmethod
     def compare_dice(dice_a, dice_b):
         """Simulate all possible outcomes and calculate the win probability for dice_a."""
-        win_count = 0
-        total_count = 0
-        for face_a in dice_a.values:
-            for face_b in dice_b.values:
-                if face_a > face_b:
-                    win_count += 1
-                total_count += 1
-        return round(win_count / total_count, 4)
+        win_count = sum(face_a > face_b for face_a in dice_a.values for face_b in dice_b.values)
+        return win_count / (len(dice_a.values) * len(dice_b.values))
 
     @staticmethod
-    def colorize_probability(value):
-        """Colorize probabilities based on their value."""
-        if value > 0.5:
-            return f"{Fore.GREEN}{value:.4f}{Style.RESET_ALL}"  # Green for high probabilities
-        elif value >= 0.33:
-            return f"{Fore.YELLOW}{value:.4f}{Style.RESET_ALL}"  # Yellow for medium probabilities
-        else:
-            return f"{Fore.RED}{value:.4f}{Style.RESET_ALL}"  # Red for low probabilities
+    def categorize_probabilities(probabilities):
+        """Map each probability to its color category (0 - low, 1 - medium, 2 - high)."""
+        import numpy as np
+
+        return np.select([probabilities > 0.5, probabilities >= 0.33], [2, 1], default=0)
 
     @staticmethod
     def generate_help_table(dice):
+        from tabulate import tabulate
+
         probabilities = ProbabilityCalculator.calculate_probabilities(dice)
-        headers = ["User dice v"] + [",".join(map(str, d.values)) for d in dice]
+        categories = ProbabilityCalculator.categorize_probabilities(probabilities)
+        headers = ["User dice v"] + [d.values_str for d in dice]
 
         rows = []
         for i, dice_row in enumerate(dice):
-            row = [",".join(map(str, dice_row.values))]
-            for j in range(len(dice)):
+            row = [dice_row.values_str]
+            for j, (category, value) in enumerate(zip(categories[i].tolist(), probabilities[i].tolist())):
                 if i == j:
-                    row.append(f"{Fore.CYAN}- (0.3333){Style.RESET_ALL}")  # Cyan for ties
+                    row.append(_TIE_CELL)
                 else:
-                    row.append(ProbabilityCalculator.colorize_probability(probabilities[i][j]))
+                    row.append(_CATEGORY_FORMATS[category].format(value))
             rows.append(row)
 
         table = tabulate(rows, headers, tablefmt="grid")
@@ -66,10 +97,13 @@ class ProbabilityCalculator:
 
 
 class Dice:
-    def __init__(self, values: List[int]):
+    __slots__ = ('values', 'values_str')
+
+    def __init__(self, values: Sequence[int]):
         if len(values) != 6:
             raise ValueError("Each die must have exactly 6 values.")
-        self.values = values
+        self.values = tuple(values)
+        self.values_str = ",".join(map(str, values))
 
     def roll(self, index: int) -> int:
         return self.values[index]
@@ -83,7 +117,7 @@ class DiceParser:
         dice = []
         for arg in args:
             try:
-                values = list(map(int, arg.split(',')))
+                values = tuple(map(int, arg.split(',')))  # Dice keeps this tuple as-is
                 dice.append(Dice(values))
             except ValueError:
                 raise ValueError(f"Invalid dice configuration: {arg}")
@@ -96,112 +130,137 @@ class FairRandomGenerator:
         """Generates a fair number, HMAC, and secret key."""
         secret_key = secrets.token_bytes(32)  # Generate a 256-bit key
         computer_number = secrets.randbelow(max_val - min_val + 1) + min_val
-        hmac_value = hmac.new(secret_key, str(computer_number).encode(), hashlib.sha3_256).hexdigest()
+        hmac_value = hmac.digest(secret_key, str(computer_number).encode(), "sha256").hex()
         return computer_number, hmac_value, secret_key
 
+    @staticmethod
+    def generate_batch(n: int, min_val: int, max_val: int) -> deque:
+        """Generates n independent fair numbers as a queue to be consumed in order."""
+        keys = os.urandom(32 * n)  # All 256-bit keys in one syscall
+        pool = deque()
+        for i in range(n):
+            secret_key = keys[32 * i:32 * (i + 1)]
+            computer_number = secrets.randbelow(max_val - min_val + 1) + min_val
+            hmac_value = hmac.digest(secret_key, str(computer_number).encode(), "sha256").hex()
+            pool.append((computer_number, hmac_value, secret_key))
+        return pool
+
 
 class Game:
     def __init__(self, dice: List[Dice]):
         self.dice = dice
-        self.remaining_dice = list(range(len(dice)))  # Track indices of remaining dice
+        self.remaining_mask = (1 << len(dice)) - 1  # Bit i is set while dice i is still available
+        self._help_table_str = None  # Rendered help table, reused on later help requests
+        self._throw_pool = FairRandomGenerator.generate_batch(2, 0, 5)  # One fair number per throw
 
     def determine_first_move(self) -> str:
-        print("\nLet's determine who makes the first move.")
-        computer_number, hmac_value, secret_key = FairRandomGenerator.generate_fair_number(0, 1)
-        print(f"I selected a random value in the range 0..1 (HMAC={hmac_value}).")
-        print("Try to guess my selection.")
-        user_guess = input("0 - 0\n1 - 1\nX - exit\n? - help\nYour selection: ").strip()
-
-        if user_guess.lower() == "x":
-            print("Exiting the game.")
-            sys.exit(0)
-        elif user_guess.lower() == "?":
-            self.help_option()
-            return self.determine_first_move()
-
-        try:
-            user_guess = int(user_guess)
-            if user_guess not in [0, 1]:
-                raise ValueError
-        except ValueError:
-            print("Invalid input. Please choose 0 or 1.")
-            return self.determine_first_move()
-
-        print(f"My selection: {computer_number} (KEY={secret_key.hex()}).")
-        return "computer" if computer_number != user_guess else "user"
+        while True:
+            print("\nLet's determine who makes the first move.")
+            computer_number, hmac_value, secret_key = FairRandomGenerator.generate_fair_number(0, 1)
+            print(f"I selected a random value in the range 0..1 (HMAC={hmac_value}).")
+            print("Try to guess my selection.")
+            user_guess = input("0 - 0\n1 - 1\nX - exit\n? - help\nYour selection: ").strip()
+
+            if user_guess.lower() == "x":
+                print("Exiting the game.")
+                sys.exit(0)
+            elif user_guess.lower() == "?":
+                self.help_option()
+                continue
+
+            try:
+                user_guess = int(user_guess)
+                if user_guess not in [0, 1]:
+                    raise ValueError
+            except ValueError:
+                print("Invalid input. Please choose 0 or 1.")
+                continue
+
+            print(f"My selection: {computer_number} (KEY={secret_key.hex()}).")
+            return "computer" if computer_number != user_guess else "user"
+
+    def remaining_indices(self):
+        """Yield the indices of the remaining dice in ascending order."""
+        mask = self.remaining_mask
+        while mask:
+            yield (mask & -mask).bit_length() - 1  # Index of the lowest set bit
+            mask &= mask - 1
 
     def computer_select_dice(self, is_first: bool) -> Tuple[Dice, int]:
         # Select a random dice index from the remaining dice
-        computer_choice = random.choice(self.remaining_dice)
-        self.remaining_dice.remove(computer_choice)  # Remove the selected dice from remaining
+        computer_choice = random.choice(list(self.remaining_indices()))
+        self.remaining_mask &= ~(1 << computer_choice)  # Remove the selected dice from remaining
         computer_dice = self.dice[computer_choice]
 
         if not is_first:
-            print(f"I choose the [{','.join(map(str, computer_dice.values))}] dice.")
+            print(f"I choose the [{computer_dice.values_str}] dice.")
         return computer_dice, computer_choice
 
     def user_select_dice(self) -> Tuple[Dice, int]:
-        print("\nChoose your dice:")
-        for i in self.remaining_dice:
-            print(f"{i} - {','.join(map(str, self.dice[i].values))}")
-        print("X - exit")
-        print("? - help")
-
-        selection = input("Your selection: ").strip()
-        if selection.lower() == "x":
-            print("Exiting the game.")
-            sys.exit(0)
-        elif selection.lower() == "?":
-            self.help_option()
-            return self.user_select_dice()
-        print(f"You choose the {self.dice[int(selection)].values} dice.")
-        try:
-            index = int(selection)
-            if index in self.remaining_dice:
-                self.remaining_dice.remove(index)  # Remove selected die from remaining dice
-                return self.dice[index], index
-        except ValueError:
-            pass
-
-        print("Invalid choice. Try again.")
-        return self.user_select_dice()
+        while True:
+            print("\nChoose your dice:")
+            for i in self.remaining_indices():
+                print(f"{i} - {self.dice[i].values_str}")
+            print("X - exit")
+            print("? - help")
+
+            selection = input("Your selection: ").strip()
+            if selection.lower() == "x":
+                print("Exiting the game.")
+                sys.exit(0)
+            elif selection.lower() == "?":
+                self.help_option()
+                continue
+            try:
+                index = int(selection)
+                if 0 <= index < len(self.dice) and self.remaining_mask & (1 << index):
+                    print(f"You choose the [{self.dice[index].values_str}] dice.")
+                    self.remaining_mask &= ~(1 << index)  # Remove selected die from remaining dice
+                    return self.dice[index], index
+            except ValueError:
+                pass
+
+            print("Invalid choice. Try again.")
 
     def play_throw(self, dice: Dice, is_user: bool):
-        if is_user:
-            print("\nIt's time for your throw.")
-        else:
-            print("\nIt's time for my throw.")
-
-        computer_number, hmac_value, secret_key = FairRandomGenerator.generate_fair_number(0, 5)
-        print(f"I selected a random value in the range 0..5 (HMAC={hmac_value}).")
-
-        user_number = input("Add your number modulo 6.\n0 - 0\n1 - 1\n2 - 2\n3 - 3\n4 - 4\n5 - 5\nX - exit\n? - help\nYour selection: ").strip()
-        if user_number.lower() == "x":
-            print("Exiting the game.")
-            sys.exit(0)
-        elif user_number.lower() == "?":
-            self.help_option()
-            return self.play_throw(dice, is_user)
-
-        try:
-            user_number = int(user_number)
-            if 0 <= user_number <= 5:
-                result = (computer_number + user_number) % 6
-                print(f"My number is {computer_number} (KEY={secret_key.hex()}).")
-                print(f"The result is {computer_number} + {user_number} = {result} (mod 6).")
-                return dice.roll(result)
-        except ValueError:
-            pass
-
-        print("Invalid input. Try again.")
-        return self.play_throw(dice, is_user)
+        while True:
+            if is_user:
+                print("\nIt's time for your throw.")
+            else:
+                print("\nIt's time for my throw.")
+
+            if self._throw_pool:
+                computer_number, hmac_value, secret_key = self._throw_pool.popleft()
+            else:
+                computer_number, hmac_value, secret_key = FairRandomGenerator.generate_fair_number(0, 5)
+            print(f"I selected a random value in the range 0..5 (HMAC={hmac_value}).")
+
+            user_number = input("Add your number modulo 6.\n0 - 0\n1 - 1\n2 - 2\n3 - 3\n4 - 4\n5 - 5\nX - exit\n? - help\nYour selection: ").strip()
+            if user_number.lower() == "x":
+                print("Exiting the game.")
+                sys.exit(0)
+            elif user_number.lower() == "?":
+                self.help_option()
+                continue
+
+            try:
+                user_number = int(user_number)
+                if 0 <= user_number <= 5:
+                    result = (computer_number + user_number) % 6
+                    print(f"My number is {computer_number} (KEY={secret_key.hex()}).")
+                    print(f"The result is {computer_number} + {user_number} = {result} (mod 6).")
+                    return dice.roll(result)
+            except ValueError:
+                pass
+
+            print("Invalid input. Try again.")
 
     def start_game(self):
         first_mover = self.determine_first_move()
 
         if first_mover == "computer":
             computer_dice, _ = self.computer_select_dice(is_first=True)
-            print(f"I make the first move and choose the {computer_dice.values} dice.")
+            print(f"I make the first move and choose the [{computer_dice.values_str}] dice.")
             user_dice, _ = self.user_select_dice()
         else:
             print("You make the first move.")
@@ -221,13 +280,17 @@ class Game:
             print(f"It's a tie ({user_throw} = {computer_throw})!")
 
     def help_option(self):
-        print("\nGame Rules:")
-        print("Each dice has six faces with values as defined at the start.")
-        print("Your goal is to choose a dice with a higher probability of winning.")
-        print("\nProbability of the win for the user:")
-
-        table = ProbabilityCalculator.generate_help_table(self.dice)
-        print(table)
+        if self._help_table_str is None:
+            self._help_table_str = ProbabilityCalculator.generate_help_table(self.dice)
+
+        lines = [
+            "\nGame Rules:",
+            "Each dice has six faces with values as defined at the start.",
+            "Your goal is to choose a dice with a higher probability of winning.",
+            "\nProbability of the win for the user:",
+            self._help_table_str,
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")  # Emit the whole help screen in one write
 
 
 def main():